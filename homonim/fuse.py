@@ -28,6 +28,7 @@ import rasterio
 import rasterio as rio
 from rasterio.enums import Resampling
 from rasterio.io import DatasetWriter
+from rasterio.windows import Window
 from tqdm import tqdm
 
 from homonim import utils
@@ -123,8 +124,8 @@ class RasterFuse(RasterPairReader):
         # TODO: test effect of photometric=None on full size NGI files with ProcCrs.src param im (is bigtiff
         #  necessary then?).  Also test ovw compress with / w/o compress_overview
         creation_options = creation_options or dict(
-            tiled=True, blockxsize=512, blockysize=512, compress='deflate', interleave='band', photometric=None,
-            bigtiff='if_safer', compress_overview='auto',
+            tiled=True, blockxsize=512, blockysize=512, compress='zstd', num_threads='all_cpus',
+            interleave='band', photometric=None, bigtiff='if_safer', compress_overview='auto',
         )
         return dict(driver=driver, dtype=dtype, nodata=nodata, creation_options=creation_options)
 
@@ -265,6 +266,16 @@ class RasterFuse(RasterPairReader):
                     self._build_overviews(param_im)
                 param_im.close()
 
+    def _param_out_block(self, block_pair: BlockPair) -> Window:
+        """ Return the parameter image window corresponding to ``block_pair``. """
+        return block_pair.ref_out_block if self.proc_crs == ProcCrs.ref else block_pair.src_out_block
+
+    def _write_param_block(self, param_im: DatasetWriter, param_ra: RasterArray, block_pair: BlockPair):
+        """ Thread-safe method to write the parameter block for ``block_pair`` to the parameter image. """
+        indexes = np.arange(param_ra.count) * len(self.src_bands) + block_pair.band_i + 1
+        with self._param_lock:
+            param_ra.to_rio_dataset(param_im, indexes=indexes, window=self._param_out_block(block_pair))
+
     def _process_block(
         self, block_pair: BlockPair, model: KernelModel, corr_im: DatasetWriter,
         param_im: Optional[DatasetWriter] = None,
@@ -273,9 +284,27 @@ class RasterFuse(RasterPairReader):
         Thread-safe method to correct an image block to surface reflectance using the supplied correction ``model``.
         Corrected, and optionally parameter, blocks are written to the supplied image dataset(s).
         """
-        # read source and reference blocks
-        src_ra, ref_ra = self.read(block_pair)
-        # fit and apply the sliding kernel models
+        self._assert_open()
+        src_ra = self._read_src(block_pair)
+        if not np.any(src_ra.mask):
+            # the source block contains no valid pixels (e.g. it lies in the source nodata border), so skip the
+            # reference read and model fitting, and write nodata corrected and parameter blocks.
+            src_ra.nodata = corr_im.nodata
+            with self._corr_lock:
+                src_ra.to_rio_dataset(corr_im, indexes=block_pair.band_i + 1, window=block_pair.src_out_block)
+
+            if param_im:
+                param_out_block = self._param_out_block(block_pair)
+                param_profile = dict(
+                    crs=param_im.crs, transform=param_im.window_transform(param_out_block),
+                    width=param_out_block.width, height=param_out_block.height,
+                    count=param_im.count // len(self.src_bands), dtype=param_im.dtypes[0], nodata=param_im.nodata
+                )
+                self._write_param_block(param_im, RasterArray.from_profile(None, param_profile), block_pair)
+            return
+
+        # read the reference block, then fit and apply the sliding kernel models
+        ref_ra = self._read_ref(block_pair)
         param_ra = model.fit(src_ra, ref_ra)
         corr_ra = model.apply(src_ra, param_ra)
         # change the corrected nodata value so that is masked correctly for corr_im
@@ -285,12 +314,7 @@ class RasterFuse(RasterPairReader):
             corr_ra.to_rio_dataset(corr_im, indexes=block_pair.band_i + 1, window=block_pair.src_out_block)
 
         if param_im:
-            with self._param_lock:  # write the parameter block
-                indexes = np.arange(param_ra.count) * len(self.src_bands) + block_pair.band_i + 1
-                param_out_block = (
-                    block_pair.ref_out_block if self.proc_crs == ProcCrs.ref else block_pair.src_out_block
-                )
-                param_ra.to_rio_dataset(param_im, indexes=indexes, window=param_out_block)
+            self._write_param_block(param_im, param_ra, block_pair)
 
     def process(
         self,
@@ -394,7 +394,7 @@ class KernelModel:
         # Similar to the block overlap amount, this removes ceil(kernel_shape/2) pixels from the nodata edge.  Note,
         # that this is the strict approach for proc_crs == ref, it could be floor(kernel_shape/2) for proc_crs == src,
         # which avoids the additional upsampling step.
-        se = cv.getStructuringElement(cv.MORPH_RECT, tuple(np.array(self._kernel_shape[::-1]) + 2))
+        se = cv.getStructuringElement(cv.MORPH_RECT, tuple(dim + 2 for dim in self._kernel_shape[::-1]))
         mask_ra.array = cv.erode(mask, se, borderType=cv.BORDER_CONSTANT, borderValue=0)
         return mask_ra
 
@@ -447,10 +447,20 @@ class KernelModel:
         """
         if (param_ra.transform != src_ra.transform) or (param_ra.shape != src_ra.shape):
             raise ValueError("'param_ra' and 'src_ra' must have the same CRS, transform and shape")
-        corr_array = (param_ra.array[0] * src_ra.array) + param_ra.array[1]
+        corr_array = self._apply_params(src_ra.array, param_ra.array)
         corr_ra = RasterArray.from_profile(corr_array, param_ra.profile)
         return corr_ra
 
+    @staticmethod
+    def _apply_params(src_array: np.ndarray, param_array: np.ndarray, out: ONdArray = None) -> np.ndarray:
+        """
+        Return corr = gain * src + offset for the given source and parameter arrays.  The result is written into
+        ``out`` if it is provided, otherwise a new array is allocated.  The offset is added in-place to avoid allocating
+        a second full block temporary.
+        """
+        out = np.multiply(param_array[0], src_array, out=out)
+        return np.add(out, param_array[1], out=out)
+
 
 class RefSpaceModel(KernelModel):
     """
@@ -488,8 +498,10 @@ class RefSpaceModel(KernelModel):
         else:
             param_us_ra.mask = src_ra.mask
 
-        # call base class apply with source and parameter RasterArrays in the source CRS & grid
-        return KernelModel.apply(self, src_ra, param_us_ra)
+        # param_us_ra is a temporary in the source CRS & grid, so rather than call the base class apply, write the
+        # corrected block into its gain band to avoid allocating another full resolution array
+        corr_array = self._apply_params(src_ra.array, param_us_ra.array, out=param_us_ra.array[0])
+        return RasterArray.from_profile(corr_array, param_us_ra.profile)
 
 
 class SrcSpaceModel(KernelModel):
@@ -88,7 +88,6 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
             raise TypeError("`transform` must be an instance of rasterio.transform.Affine")
 
         self._nodata = nodata
-        self._nodata_mask = None
 
     @classmethod
     def from_profile(cls, array: Optional[np.ndarray], profile: Dict, window: Optional[Window] = None) -> 'RasterArray':
@@ -165,21 +164,26 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
             window = Window(col_off=0, row_off=0, width=rio_dataset.width, height=rio_dataset.height)
 
         # check bands if bands have masks (i.e. internal/side-car mask or alpha channel), as opposed to nodata value
-        is_masked = any([MaskFlags.per_dataset in rio_dataset.mask_flag_enums[bi - 1] for bi in index_list])
+        # (mask_flag_enums is re-computed for all bands on each access, so access it once only)
+        mask_flag_enums = rio_dataset.mask_flag_enums
+        is_masked = any([MaskFlags.per_dataset in mask_flag_enums[bi - 1] for bi in index_list])
 
         # use the dataset's nodata value if it 'unmasked', and has one, otherwise revert to default
         nodata = cls.default_nodata if (is_masked or rio_dataset.nodata is None) else rio_dataset.nodata
 
-        # construct an array of nodata matching the (possibly boundless) window dimension
+        # construct an array matching the (possibly boundless) window dimension, with nodata outside the dataset
+        # bounds (the bounded region is read into below, so is not initialised)
         bounded_window, bounded_slices = cls.bounded_window_slices(rio_dataset, window)
         if len(index_list) > 1:
-            array = np.full((len(index_list), window.height, window.width), fill_value=nodata, dtype=cls.default_dtype)
+            array = np.empty((len(index_list), window.height, window.width), dtype=cls.default_dtype)
+            cls._fill_outside_slices(array, bounded_slices, nodata)
             bounded_array = array[(slice(array.shape[0]), *bounded_slices)]  # a bounded view into array
             rio_dataset.read(
                 out=bounded_array, indexes=index_list, window=bounded_window, out_dtype=cls.default_dtype, **kwargs
             )
         else:
-            array = np.full((window.height, window.width), fill_value=nodata, dtype=cls.default_dtype)
+            array = np.empty((window.height, window.width), dtype=cls.default_dtype)
+            cls._fill_outside_slices(array, bounded_slices, nodata)
             bounded_array = array[bounded_slices]  # a bounded view into array
             rio_dataset.read(
                 out=bounded_array, indexes=index_list[0], window=bounded_window, out_dtype=cls.default_dtype, **kwargs
@@ -196,25 +200,32 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
 
         return cls(array, rio_dataset.crs, rio_dataset.transform, nodata=nodata, window=window)
 
+    @staticmethod
+    def _fill_outside_slices(array: np.ndarray, slices: Tuple[slice, slice], value: float):
+        """ Fill the (row, column) border of ``array`` outside of ``slices`` with ``value``. """
+        row_slice, col_slice = slices
+        array[..., :row_slice.start, :] = value
+        array[..., row_slice.stop:, :] = value
+        array[..., row_slice, :col_slice.start] = value
+        array[..., row_slice, col_slice.stop:] = value
+
     @staticmethod
     def bounded_window_slices(
         rio_dataset: Union[rio.DatasetReader, rio.io.DatasetWriter], window: Window
     ) -> Tuple[Window, Tuple[slice, slice]]:  # yapf: disable
         """ Bounded array slices and dataset window from dataset and boundless window. """
 
-        # find window UL and BR corners and crop to rio_dataset bounds
-        win_ul = np.array((window.row_off, window.col_off))
-        win_br = win_ul + np.array((window.height, window.width))
-        bounded_ul = np.fmax(win_ul, (0, 0))
-        bounded_br = np.fmin(win_br, rio_dataset.shape)
+        # find window UL and BR corners and crop to rio_dataset bounds (python scalars are faster than numpy
+        # arrays for this)
+        win_ul = (window.row_off, window.col_off)
+        win_br = (window.row_off + window.height, window.col_off + window.width)
+        bounded_ul = (max(win_ul[0], 0), max(win_ul[1], 0))
+        bounded_br = (min(win_br[0], rio_dataset.height), min(win_br[1], rio_dataset.width))
 
         # create bounded window and slices from bounded corners
         bounded_window = Window.from_slices((bounded_ul[0], bounded_br[0]), (bounded_ul[1], bounded_br[1]))
-        bounded_start = bounded_ul - win_ul
-        bounded_stop = bounded_start + (bounded_br - bounded_ul)
-        bounded_slices = (
-            slice(bounded_start[0], bounded_stop[0], None),
-            slice(bounded_start[1], bounded_stop[1], None)
+        bounded_slices = tuple(
+            slice(bul - wul, bbr - wul, None) for wul, bul, bbr in zip(win_ul, bounded_ul, bounded_br)
         )  # yapf: disable
         return bounded_window, bounded_slices
 
@@ -253,7 +264,7 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
     @property
     def count(self) -> int:
         """ Number of bands. """
-        return self._array.shape[0] if self.array.ndim == 3 else 1
+        return self._array.shape[0] if self._array.ndim == 3 else 1
 
     @property
     def dtype(self) -> str:
@@ -297,17 +308,27 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         """ 2D boolean mask corresponding to valid pixels in the array. """
         if self._nodata is None:
             return np.full(self._array.shape[-2:], True)
-        mask = ~utils.nan_equals(self._array, self._nodata)
-        if self._array.ndim > 2:
-            mask = np.any(mask, axis=0)
+        # find pixels that are nodata in all bands, folding in one band at a time to avoid a 3D temporary
+        bands = self._array if self._array.ndim > 2 else (self._array, )
+        mask = utils.nan_equals(bands[0], self._nodata)
+        for band in bands[1:]:
+            np.logical_and(mask, utils.nan_equals(band, self._nodata), out=mask)
+        np.logical_not(mask, out=mask)
         return mask
 
     @mask.setter
     def mask(self, value: numpy.ndarray):
-        if self._array.ndim == 2:
-            self._array[~value] = self._nodata
-        else:
-            self._array[:, ~value] = self._nodata
+        np.copyto(self._array, self._cast_nodata(self._nodata), where=~value)
+
+    def _cast_nodata(self, value: float) -> numpy.ndarray:
+        """ Cast a nodata value to the array data type, raising an error if it cannot be represented. """
+        cast_value = np.array(value)
+        if np.issubdtype(self._array.dtype, np.integer):
+            with np.errstate(invalid='ignore'):
+                cast_value = cast_value.astype(self._array.dtype)
+            if not cast_value == value:
+                raise ValueError(f'Nodata value {value} cannot be represented by the array data type {self.dtype}.')
+        return cast_value
 
     @property
     def mask_ra(self) -> 'RasterArray':
@@ -332,11 +353,9 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         elif not (utils.nan_equals(value, self._nodata)):
             # if the new nodata value is different to the current nodata,
             # set the mask area in array to the new nodata value and return
-            nodata_mask = ~self.mask
-            if self._array.ndim == 3:
-                self._array[:, nodata_mask] = value
-            else:
-                self._array[nodata_mask] = value
+            # replace the current nodata value element-wise (i.e. in all bands, including the bands of pixels that
+            # are valid in other bands), using a masked copy which is faster than boolean index assignment
+            np.copyto(self._array, self._cast_nodata(value), where=utils.nan_equals(self._array, self._nodata))
             self._nodata = value
 
     def copy(self) -> 'RasterArray':
@@ -358,21 +377,24 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         RasterArray
             Sliced RasterArray.
         """
-        window = self.window(*bounds)
-        window = utils.round_window_to_grid(window)
-        ul = np.array((window.row_off, window.col_off))
-        shape = np.array((window.height, window.width))
-        if np.any(ul < 0) or np.any(shape > self._array.shape[-2:]):
+        # find the pixel extents of the bounds rounded to the grid, as with self.window() and
+        # utils.round_window_to_grid(), but in python scalars to avoid the Window overheads
+        left, bottom, right, top = bounds
+        inv_transform = ~self._transform
+        cols, rows = zip(*[inv_transform * xy for xy in ((left, top), (right, top), (right, bottom), (left, bottom))])
+        row_start, row_stop = round(min(rows)), round(max(rows))
+        col_start, col_stop = round(min(cols)), round(max(cols))
+        if (
+            (row_start < 0) or (col_start < 0) or (row_stop - row_start > self._array.shape[-2]) or
+            (col_stop - col_start > self._array.shape[-1])
+        ):  # yapf: disable
             raise ValueError(
                 f'The provided bounds ({bounds}) lie outside the extent of the RasterArray ({self.bounds})'
             )
 
-        if self._array.ndim == 2:
-            array = self._array[window.toslices()]
-        else:
-            array = self._array[(slice(self._array.shape[0]), *window.toslices())]
-
-        return RasterArray(array, self._crs, self.window_transform(window), nodata=self._nodata)
+        array = self._array[..., row_start:row_stop, col_start:col_stop]
+        transform = self._transform * Affine.translation(col_start, row_start)
+        return RasterArray(array, self._crs, transform, nodata=self._nodata)
 
     def to_rio_dataset(
         self, rio_dataset: rio.io.DatasetWriter, indexes: Optional[Union[int, List[int]]] = None,
@@ -402,7 +424,7 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         kwargs: optional
             Arguments to pass through the dataset's write() method.
         """
-        if not np.all(np.abs(self.res) == np.abs(rio_dataset.res)):
+        if any(abs(res) != abs(ds_res) for res, ds_res in zip(self.res, rio_dataset.res)):
             raise ImageFormatError(
                 f'The dataset resolution does not match that of the RasterArray. '
                 f'Dataset res: {rio_dataset.res}, RasterArray res: {self.res}'
@@ -418,8 +440,9 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
             indexes = utils.get_nonalpha_bands(rio_dataset)
             indexes = indexes if len(indexes) > 1 else indexes[0]
 
-        if np.any((np.array(indexes) < 1) | (np.array(indexes) > rio_dataset.count)):
-            error_indexes = np.array(indexes)[np.array(indexes) > rio_dataset.count]
+        index_list = [indexes] if np.isscalar(indexes) else indexes
+        error_indexes = [bi for bi in index_list if (bi < 1) or (bi > rio_dataset.count)]
+        if len(error_indexes) > 0:
             raise ValueError(f'Band index(es) {error_indexes} are out of the valid range (1..{rio_dataset.count})')
 
         if (not np.isscalar(indexes)) and (len(indexes) > self.count):
@@ -437,7 +460,7 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         # crop the RasterArray to match the bounds of the dataset window
         bounded_ra = self.slice_to_bounds(*rio_dataset.window_bounds(window))
 
-        if np.any(bounded_ra.shape != np.array((window.height, window.width))):
+        if bounded_ra.shape != (window.height, window.width):
             raise ValueError(
                 f'The bounds of the dataset / window ({rio_dataset.window_bounds(window)}) lie outside the '
                 f'bounds of the RasterArray ({bounded_ra.bounds})'
@@ -464,10 +487,58 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
             with rio.open(filename, 'w', driver=driver, **self.profile, **kwargs) as out_im:
                 out_im.write(self._array, indexes=range(1, self.count + 1) if self.count > 1 else 1)
 
+    def _reproject_block_mean(
+        self, crs: CRS, transform: Affine, shape: Tuple[int, int], nodata: float, dtype: str
+    ) -> Optional['RasterArray']:  # yapf: disable
+        """
+        Return the `average` re-projection of the RasterArray as a mean over integer blocks of pixels, when the
+        destination grid is an integer down-sampling aligned with this RasterArray's grid, lies inside its bounds, and
+        has a floating point ``dtype``.  Otherwise, return None.
+        """
+        src_transform = self._transform
+        if (
+            (src_transform.b != 0) or (src_transform.d != 0) or (transform.b != 0) or (transform.d != 0) or
+            (self._nodata is not None and nodata is None) or not np.issubdtype(dtype, np.floating)
+        ):  # yapf: disable
+            return None
+
+        # find the down-sampling factors and the destination offset in source pixels, and check they are integers
+        factors = (transform.e / src_transform.e, transform.a / src_transform.a)
+        offsets = ((transform.f - src_transform.f) / src_transform.e, (transform.c - src_transform.c) / src_transform.a)
+        int_factors = tuple(round(factor) for factor in factors)
+        int_offsets = tuple(round(offset) for offset in offsets)
+        if (
+            any(abs(val - int_val) > 1e-6 for val, int_val in zip(factors + offsets, int_factors + int_offsets)) or
+            any(factor < 1 for factor in int_factors) or any(offset < 0 for offset in int_offsets) or
+            any(off + (dim * factor) > src_dim for off, dim, factor, src_dim in
+                zip(int_offsets, shape, int_factors, self.shape))
+        ):  # yapf: disable
+            return None
+        if crs != self._crs:  # compare CRSs last, as this is slow
+            return None
+
+        # view the covered source pixels as blocks, and find the mean of the valid pixels in each block (as with
+        # GDAL, a pixel is valid if it is valid in any band)
+        slices = tuple(
+            slice(offset, offset + (dim * factor)) for offset, dim, factor in zip(int_offsets, shape, int_factors)
+        )
+        array = self._array[(..., *slices)]
+        valid = self.mask[slices]
+        if self._nodata is not None:
+            array = np.where(valid, array, 0)
+        block_sum = array.reshape(
+            *array.shape[:-2], shape[0], int_factors[0], shape[1], int_factors[1]
+        ).sum(axis=(-3, -1), dtype='float64')
+        block_count = valid.reshape(shape[0], int_factors[0], shape[1], int_factors[1]).sum(axis=(-3, -1))
+
+        dst_array = np.full(block_sum.shape, fill_value=nodata if nodata is not None else 0, dtype=dtype)
+        np.divide(block_sum, block_count, out=dst_array, where=block_count > 0, casting='unsafe')
+        return RasterArray(dst_array, crs=crs, transform=transform, nodata=nodata)
+
     def reproject(
         self, crs: Optional[CRS] = None, transform: Optional[Affine] = None, shape: Optional[Tuple[int, int]] = None,
         nodata: float = default_nodata, dtype: str = default_dtype, resampling: Resampling = Resampling.lanczos,
-        **kwargs
+        out: Optional[numpy.ndarray] = None, **kwargs
     ):
         """
         Re-project the RasterArray.
@@ -487,8 +558,13 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
             Internal data type of destination array.
         resampling: rasterio.enums.Resampling, optional
             Resampling method to use.
+        out: numpy.ndarray, optional
+            Array to re-project into, with the same number of dimensions and bands as this RasterArray, and ``shape``
+            (rows, columns).  Its data type is used in place of ``dtype``.  The returned RasterArray wraps ``out``.
+            The default is to allocate a new array.
         kwargs: dict, optional
-            Arguments to passed through the rasterio's reproject() function.
+            Arguments to passed through the rasterio's reproject() function.  ``num_threads`` defaults to the number
+            of CPUs, and ``warp_mem_limit`` to a size that fits the source and destination arrays (64-512MB).
 
         Returns
         -------
@@ -506,15 +582,38 @@ class RasterArray(TransformMethodsMixin, WindowMethodsMixin):
         shape = shape or self.shape
         dtype = dtype or self.dtype
 
-        if self.array.ndim > 2:
-            _dst_array = np.zeros((self._array.shape[0], *shape), dtype=dtype)
+        if (
+            resampling == Resampling.average and transform is not None and out is None and
+            kwargs.keys() <= {'num_threads', 'warp_mem_limit'}
+        ):  # yapf: disable
+            # avoid the GDAL warper when 'average' down-sampling to an aligned integer multiple of this grid
+            dst_ra = self._reproject_block_mean(crs, transform, shape, nodata, dtype)
+            if dst_ra is not None:
+                return dst_ra
+
+        # reproject() initialises the destination with nodata (or 0 if nodata is None) unless init_dest_nodata=False,
+        # so avoid initialising it here
+        dst_shape = (self._array.shape[0], *shape) if self._array.ndim > 2 else tuple(shape)
+        if out is None:
+            alloc_array = np.empty if kwargs.get('init_dest_nodata', True) else np.zeros
+            _dst_array = alloc_array(dst_shape, dtype=dtype)
+        elif out.shape != dst_shape:
+            raise ValueError(f"'out' shape {out.shape} does not match the destination shape {dst_shape}")
         else:
-            _dst_array = np.zeros(shape, dtype=dtype)
+            _dst_array = out
+
+        # Size GDAL's warp memory (MB) so that the source and destination arrays are warped in one chunk where
+        # possible.  The GDAL default of 64MB splits large blocks into chunks whose edges are resampled twice.  GDAL
+        # allocates warp buffers of this size in addition to the arrays (and per concurrent block), so cap it at 512MB.
+        if 'warp_mem_limit' not in kwargs:
+            warp_mem_limit = int(np.ceil((self._array.nbytes + _dst_array.nbytes) / 2 ** 20))
+            kwargs['warp_mem_limit'] = min(max(64, warp_mem_limit), 512)
+        kwargs.setdefault('num_threads', multiprocessing.cpu_count())
 
         _, _dst_transform = reproject(
             self._array, destination=_dst_array, src_crs=self._crs, src_transform=self._transform,
             src_nodata=self._nodata, dst_crs=crs, dst_transform=transform, dst_nodata=nodata,
-            num_threads=multiprocessing.cpu_count(), resampling=resampling, **kwargs
+            resampling=resampling, **kwargs
         )
         return RasterArray(_dst_array, crs=crs, transform=_dst_transform, nodata=nodata)
 
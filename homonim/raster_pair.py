@@ -17,16 +17,17 @@
     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 import logging
+import math
 import pathlib
 import threading
 from contextlib import ExitStack
-from itertools import product
-from typing import Tuple, NamedTuple, Union, Iterable
+from typing import Tuple, NamedTuple, Union, Iterable, Optional
 
 import numpy as np
 import rasterio
 import rasterio as rio
 from rasterio.enums import MaskFlags
+from rasterio.env import get_gdal_config
 from rasterio.vrt import WarpedVRT
 from rasterio.warp import Resampling
 from rasterio.windows import Window
@@ -89,6 +90,8 @@ class RasterPairReader:
         self._src_im = None
         self._ref_im = None
         self._stack = None
+        self._block_row_bytes = 0
+        self._need_warp = False
         self._init_image_pair()
 
     @property
@@ -128,7 +131,8 @@ class RasterPairReader:
         """ Validate an open rasterio dataset for use as a source or reference image. """
 
         try:
-            _ = im.read(1, window=im.block_window(1, 0, 0))
+            # read a single pixel (this still decodes the first native block, which is enough to check the codec)
+            _ = im.read(1, window=Window(0, 0, 1, 1))
         except Exception as ex:
             if 'compress' in im.profile and im.profile['compress'] == 'jpeg':  # assume it is a 12bit JPEG
                 raise errors.UnsupportedImageError(
@@ -139,7 +143,7 @@ class RasterPairReader:
                 raise ex
 
         # warn if there is no nodata or associated mask
-        is_masked = any([MaskFlags.all_valid not in im.mask_flag_enums[bi] for bi in range(im.count)])
+        is_masked = any([MaskFlags.all_valid not in flags for flags in im.mask_flag_enums])
         if im.nodata is None and not is_masked:
             logger.warning(
                 f'{im.name} has no mask or nodata value, any invalid pixels should be masked before processing.'
@@ -178,23 +182,35 @@ class RasterPairReader:
 
     @staticmethod
     def _resolve_proc_crs(
-        src_im: rasterio.DatasetReader, ref_im: rasterio.DatasetReader, proc_crs: ProcCrs = ProcCrs.auto
+        src_im: rasterio.DatasetReader, ref_im: rasterio.DatasetReader, proc_crs: ProcCrs = ProcCrs.auto,
+        need_warp: Optional[bool] = None,
     ) -> ProcCrs:
         """
         Resolve a :class:`~homonim.enums.ProcCrs` instance.
         The :class:`~homonim.enums.ProcCrs` instance is resolved from :attr:`~homonim.enums.ProcCrs.auto` to the lowest
         resolution CRS of the supplied source and reference images.  If the :class:`~homonim.enums.ProcCrs` instance is
         already resolved, and doesn't correspond to the lowest resolution CRS, then a warning is issued.
+        The reference resolution is found in the source CRS if the image CRSs differ.  ``need_warp`` can be passed
+        when this is already known, to avoid comparing the CRSs again.
         """
+        if need_warp is None:
+            need_warp = src_im.crs.to_proj4() != ref_im.crs.to_proj4()
+        if need_warp:
+            with WarpedVRT(ref_im, crs=src_im.crs, resampling=Resampling.bilinear) as ref_vrt:
+                ref_res = ref_vrt.res
+        else:
+            ref_res = ref_im.res
+        src_res = src_im.res
+
         # compare source and reference resolutions
-        src_pixel_smaller = np.prod(np.abs(src_im.res)) <= np.prod(np.abs(ref_im.res))
+        src_pixel_smaller = np.prod(np.abs(src_res)) <= np.prod(np.abs(ref_res))
         cmp_str = 'smaller' if src_pixel_smaller else 'larger'
         if proc_crs == ProcCrs.auto:
             # set proc_crs to the lowest resolution of the source and reference images
             proc_crs = ProcCrs.ref if src_pixel_smaller else ProcCrs.src
             logger.debug(
-                f'Source pixel size {np.round(src_im.res, decimals=3)} is {cmp_str} than the reference '
-                f'{np.round(ref_im.res, decimals=3)}. Using proc_crs=`{proc_crs}`.'
+                f'Source pixel size {np.round(src_res, decimals=3)} is {cmp_str} than the reference '
+                f'{np.round(ref_res, decimals=3)}. Using proc_crs=`{proc_crs}`.'
             )
         elif (
             (proc_crs == ProcCrs.src and src_pixel_smaller) or
@@ -234,12 +250,8 @@ class RasterPairReader:
             :class:`~homonim.enums.ProcCrs` instance resolved to either :attr:`~homonim.enums.ProcCrs.src` or
             :attr:`~homonim.enums.ProcCrs.ref`.
         """
-        with rio.open(src_filename, 'r') as src_im, rio.open(ref_filename, 'r') as _ref_im:
-            with (
-                WarpedVRT(_ref_im, crs=src_im.crs, resampling=Resampling.bilinear)
-                if src_im.crs.to_proj4() != _ref_im.crs.to_proj4() else _ref_im
-            ) as ref_im:  # yapf: disable
-                return RasterPairReader._resolve_proc_crs(src_im, ref_im, proc_crs=proc_crs)
+        with rio.open(src_filename, 'r') as src_im, rio.open(ref_filename, 'r') as ref_im:
+            return RasterPairReader._resolve_proc_crs(src_im, ref_im, proc_crs=proc_crs)
 
     def _auto_block_shape(self, max_block_mem: float = np.inf) -> Tuple[int, int]:
         """ Find a block shape that satisfies max_block_mem. """
@@ -247,49 +259,62 @@ class RasterPairReader:
         proc_win = self._ref_win if self.proc_crs == ProcCrs.ref else self._src_win
         # adjust max_block_mem to represent the size of a block in the highest resolution image, but scaled to the
         # equivalent in proc_crs.
-        src_pix_area = np.product(np.abs(self._src_im.res))
-        ref_pix_area = np.product(np.abs(self._ref_im.res))
+        # (python rather than numpy scalar maths is used here, as it is faster for these 2-tuples)
+        src_pix_area = abs(self._src_im.res[0] * self._src_im.res[1])
+        ref_pix_area = abs(self._ref_im.res[0] * self._ref_im.res[1])
         if self.proc_crs == ProcCrs.ref:
             mem_scale = src_pix_area / ref_pix_area if ref_pix_area > src_pix_area else 1.
         elif self.proc_crs == ProcCrs.src:
             mem_scale = 1. if ref_pix_area > src_pix_area else ref_pix_area / src_pix_area
         else:
             raise ValueError("'proc_crs' has not been resolved - the raster pair must be opened first.")
-        max_block_mem = max_block_mem * mem_scale if max_block_mem > 0 else np.inf
+        max_block_mem = max_block_mem * mem_scale if max_block_mem > 0 else math.inf
 
         max_block_mem *= 2 ** 20  # convert MB to bytes
         dtype_size = np.dtype(RasterArray.default_dtype).itemsize  # the size of the RasterArray data type
 
         # set the starting block_shape to correspond to the entire window
-        block_shape = np.array((proc_win.height, proc_win.width)).astype('float')
+        block_shape = [float(proc_win.height), float(proc_win.width)]
 
         # keep halving the block_shape along the longest dimension until it satisfies max_block_mem
-        while (np.product(block_shape) * dtype_size) > max_block_mem:
-            div_dim = np.argmax(block_shape)
+        while (block_shape[0] * block_shape[1] * dtype_size) > max_block_mem:
+            div_dim = 0 if block_shape[0] >= block_shape[1] else 1
             block_shape[div_dim] /= 2
 
-        if np.any(block_shape < (1, 1)):
+        if block_shape[0] < 1 or block_shape[1] < 1:
             raise errors.BlockSizeError(f"The auto block shape is smaller than a pixel.  Increase 'max_block_mem'.")
 
-        block_shape = np.ceil(block_shape).astype('int')
+        block_shape = (math.ceil(block_shape[0]), math.ceil(block_shape[1]))
         logger.debug(
-            f'Auto block shape: {block_shape}, of image shape: {[proc_win.height, proc_win.width]}'
+            f'Auto block shape: {block_shape}, of image shape: {(proc_win.height, proc_win.width)}'
             f' ({self.proc_crs.name} pixels)'
         )
 
         # warn if the block shape in the highest res image is less than a typical tile
-        if np.any(block_shape / mem_scale < (256, 256)) and np.any(block_shape < (proc_win.height, proc_win.width)):
+        if (
+            any(dim / mem_scale < 256 for dim in block_shape) and
+            (block_shape[0] < proc_win.height or block_shape[1] < proc_win.width)
+        ):  # yapf: disable
             logger.warning(
                 f'The auto block shape is small: {block_shape}.  Increase `max_block_mem` to improve processing times.'
             )
-        return tuple(block_shape)
+        return block_shape
 
     def _init_image_pair(self):
         """ Prepare the raster pair for reading. """
-        # check and resolve proc_crs before opening
-        self._proc_crs = self.resolve_proc_crs(self._src_filename, self._ref_filename, proc_crs=self._proc_crs)
-        self.open()
+        # open the source and reference once to resolve proc_crs, and then to validate and find windows etc.
+        self._src_im = rio.open(self._src_filename, 'r')
+        self._ref_im = rio.open(self._ref_filename, 'r')
         try:
+            # find whether the source and reference CRSs differ once only, as the to_proj4() comparison is slow
+            self._need_warp = self._src_im.crs.to_proj4() != self._ref_im.crs.to_proj4()
+
+            # resolve proc_crs and re-project the pair into the same CRS (as in open())
+            self._proc_crs = self._resolve_proc_crs(
+                self._src_im, self._ref_im, proc_crs=self._proc_crs, need_warp=self._need_warp
+            )
+            self._warp_image_pair()
+
             self._validate_image_pair(self._src_im, self._ref_im)
             # get non-alpha band indices for reading
             self._src_bands = utils.get_nonalpha_bands(self._src_im)
@@ -301,6 +326,12 @@ class RasterPairReader:
             self._ref_win = utils.expand_window_to_grid(self._ref_im.window(*self._src_im.bounds))
             self._src_win = utils.expand_window_to_grid(self._src_im.window(*self._ref_im.window_bounds(self._ref_win)))
 
+            # GDAL block cache size (bytes) needed to hold a row of native blocks in all bands of both images
+            self._block_row_bytes = sum([
+                im.count * np.dtype(im.dtypes[0]).itemsize * im.block_shapes[0][0] * im.width
+                for im in (self._src_im, self._ref_im)
+            ])  # yapf: disable
+
         finally:
             self.close()
 
@@ -311,14 +342,11 @@ class RasterPairReader:
                 f'The raster pair has not been opened: {self._src_filename.name} and {self._ref_filename.name}'
             )
 
-    def open(self):
-        """ Open the source and reference images for reading. """
-        self._src_im = rio.open(self._src_filename, 'r')
-        self._ref_im = rio.open(self._ref_filename, 'r')
-
+    def _warp_image_pair(self):
+        """ Wrap the :attr:`proc_crs` dataset in a WarpedVRT, if necessary, so that the open datasets share a CRS. """
         # It is essential that the source and reference are in the same CRS so that rectangular regions of valid
         # data in one will re-project to rectangular regions of valid data in the other.
-        if self._src_im.crs.to_proj4() != self._ref_im.crs.to_proj4():
+        if self._need_warp:
             # open the image pair in the same CRS, re-projecting the proc_crs (usually lower resolution) image into the
             # CRS of the other
             if self.proc_crs == ProcCrs.src:
@@ -326,15 +354,33 @@ class RasterPairReader:
             else:
                 self._ref_im = WarpedVRT(self._ref_im, crs=self._src_im.crs, resampling=Resampling.bilinear)
 
+    def open(self):
+        """ Open the source and reference images for reading. """
+        self._src_im = rio.open(self._src_filename, 'r')
+        self._ref_im = rio.open(self._ref_filename, 'r')
+        self._warp_image_pair()
+
     def close(self):
         """ Close the source and reference image datasets. """
-        self._src_im.close()
-        self._ref_im.close()
+        for im in (self._src_im, self._ref_im):
+            if im is not None:
+                im.close()
+                if isinstance(im, WarpedVRT):
+                    # closing a WarpedVRT does not close the dataset it wraps
+                    im.src_dataset.close()
+        # release the dataset references
+        self._src_im = None
+        self._ref_im = None
 
     def __enter__(self):
         self._stack = ExitStack()
-        # TODO: if the below env settings apply to reads, then might setting gdal cache size to e.g. block size help?
-        self._stack.enter_context(rio.Env(GDAL_NUM_THREADS='ALL_CPUs', GTIFF_FORCE_RGBA=False))
+        # Raise the GDAL block cache size if necessary (up to a maximum of 2GB), so that it can hold a row of native
+        # blocks in both images.  Otherwise native blocks shared by adjacent overlapping reads can be decoded more
+        # than once.  Note that rasterio sets GDAL_CACHEMAX in bytes.
+        cache_max = max(get_gdal_config('GDAL_CACHEMAX'), min(self._block_row_bytes, 2 ** 31))
+        self._stack.enter_context(
+            rio.Env(GDAL_NUM_THREADS='ALL_CPUs', GTIFF_FORCE_RGBA=False, GDAL_CACHEMAX=cache_max)
+        )
         self._stack.enter_context(logging_redirect_tqdm([logging.getLogger(__package__)]))
         self.open()
         return self
@@ -364,15 +410,21 @@ class RasterPairReader:
         self._assert_open()
         # TODO: are these reads done in the context gdal environment?  or might we speed up by entering another
         #  environment here with NUM_THREADS=ALL_CPUS
+        return self._read_src(block_pair), self._read_ref(block_pair)
+
+    def _read_src(self, block_pair: BlockPair) -> RasterArray:
+        """ Thread-safe read of the source image block in ``block_pair``. """
         with self._src_lock:
-            src_ra = RasterArray.from_rio_dataset(
+            return RasterArray.from_rio_dataset(
                 self._src_im, indexes=self._src_bands[block_pair.band_i], window=block_pair.src_in_block
             )
+
+    def _read_ref(self, block_pair: BlockPair) -> RasterArray:
+        """ Thread-safe read of the reference image block in ``block_pair``. """
         with self._ref_lock:
-            ref_ra = RasterArray.from_rio_dataset(
+            return RasterArray.from_rio_dataset(
                 self._ref_im, indexes=self._ref_bands[block_pair.band_i], window=block_pair.ref_in_block
             )
-        return src_ra, ref_ra
 
     def block_pairs(self, overlap: Tuple[int, int] = (0, 0), max_block_mem: float = np.inf) -> Iterable[BlockPair]:
         """
@@ -411,53 +463,68 @@ class RasterPairReader:
         proc_win_ul = np.array((proc_win.row_off, proc_win.col_off))
         proc_win_br = np.array((proc_win.height + proc_win.row_off, proc_win.width + proc_win.col_off))
 
+        # affine transform from proc_crs to 'other' image pixel coordinates
+        proc_to_other = ~other_im.transform * proc_im.transform
+
+        def other_window(proc_block: Window) -> Window:
+            """
+            Return the window in 'other' image pixel coordinates that bounds ``proc_block``.  Equivalent to
+            ``other_im.window(*proc_im.window_bounds(proc_block))``, but avoids the round trip through world
+            co-ordinates.
+            """
+            (row_start, row_stop), (col_start, col_stop) = proc_block.toranges()
+            corners = ((col_start, row_start), (col_stop, row_start), (col_stop, row_stop), (col_start, row_stop))
+            cols, rows = zip(*[proc_to_other * corner for corner in corners])
+            return Window(min(cols), min(rows), max(cols) - min(cols), max(rows) - min(rows))
+
+        # Find the UL and BR corners of all overlapping blocks in proc space, with vectorised operations over the
+        # (row-major) grid of block UL corners.
+        ul_rows = np.arange(proc_win_ul[0] - overlap[0], proc_win_br[0] - overlap[0], block_shape[0])
+        ul_cols = np.arange(proc_win_ul[1] - overlap[1], proc_win_br[1] - overlap[1], block_shape[1])
+        ul = np.stack(np.meshgrid(ul_rows, ul_cols, indexing='ij'), axis=-1).reshape(-1, 2)
+        br = ul + block_shape + (2 * overlap)
+        # limit block extents to image window extents
+        in_ul = np.fmax(ul, proc_win_ul)
+        in_br = np.fmin(br, proc_win_br)
+        # find UL and BR corners for non-overlapping blocks in proc space
+        out_ul = np.fmax(ul + overlap, proc_win_ul)
+        out_br = np.fmin(br - overlap, proc_win_br)
+        # blocks touching the image boundary
+        outers = np.any(in_ul <= proc_win_ul, axis=1) | np.any(in_br >= proc_win_br, axis=1)
+        # convert to lists of python scalars for fast iteration
+        block_corners = list(zip(in_ul.tolist(), in_br.tolist(), out_ul.tolist(), out_br.tolist(), outers.tolist()))
+
+        # Form the block windows once, and re-use them for each band, as block geometry is band independent.
+        block_windows = []
+        for block_in_ul, block_in_br, block_out_ul, block_out_br, outer in block_corners:
+            # Create rasterio windows corresponding to above block corners.
+            # Note:
+            # - Consecutive proc_in_block's will overlap by exactly ``overlap``.
+            # - Consecutive proc_out_block's will be exactly adjacent.
+            proc_in_block = Window(
+                block_in_ul[1], block_in_ul[0], block_in_br[1] - block_in_ul[1], block_in_br[0] - block_in_ul[0]
+            )
+            proc_out_block = Window(
+                block_out_ul[1], block_out_ul[0], block_out_br[1] - block_out_ul[1], block_out_br[0] - block_out_ul[0]
+            )
+
+            # Create equivalent rasterio windows in 'other' space.
+            # Note:
+            # - other_in_block boundaries are expanded to ensure that re-projecting between source/reference
+            #   CRSs does not mask valid *_out_block pixels.  This means that consecutive other_in_blocks may
+            #   overlap by more than ``overlap``.
+            # - consecutive other_out_block's may overlap by a pixel.
+            other_in_block = utils.expand_window_to_grid(other_window(proc_in_block))
+            other_out_block = utils.round_window_to_grid(other_window(proc_out_block))
+
+            # assign 'proc' and 'other' back to 'src' and 'ref' in BlockPair field order, for passing to read()
+            if self.proc_crs == ProcCrs.ref:
+                block_windows.append((other_in_block, proc_in_block, other_out_block, proc_out_block, outer))
+            else:
+                block_windows.append((proc_in_block, other_in_block, proc_out_block, other_out_block, outer))
+
         # Outer loop over bands so that all blocks in a band are yielded consecutively - this is fastest for
         # reading band interleaved images.
         for band_i in range(len(self._src_bands)):
-            # Inner loop over the upper left corner row, col for each overlapping block
-            ul_row_range = range(
-                proc_win.row_off - overlap[0], proc_win.row_off + proc_win.height - overlap[0], block_shape[0]
-            )
-            ul_col_range = range(
-                proc_win.col_off - overlap[1], proc_win.col_off + proc_win.width - overlap[1], block_shape[1]
-            )
-            for ul_row, ul_col in product(ul_row_range, ul_col_range):
-                # find UL and BR corners for overlapping block in proc space
-                ul = np.array((ul_row, ul_col))
-                br = ul + block_shape + (2 * overlap)
-                # limit block extents to image window extents
-                in_ul = np.fmax(ul, proc_win_ul)
-                in_br = np.fmin(br, proc_win_br)
-                # find UL and BR corners for non-overlapping block in proc space
-                out_ul = np.fmax(ul + overlap, proc_win_ul)
-                out_br = np.fmin(br - overlap, proc_win_br)
-                # block touches image boundary?
-                outer = np.any(in_ul <= proc_win_ul) or np.any(in_br >= proc_win_br)
-
-                # Create rasterio windows corresponding to above block corners.
-                # Note:
-                # - Consecutive proc_in_block's will overlap by exactly ``overlap``.
-                # - Consecutive proc_out_block's will be exactly adjacent.
-                proc_in_block = Window(*in_ul[::-1], *np.subtract(in_br, in_ul)[::-1])
-                proc_out_block = Window(*out_ul[::-1], *np.subtract(out_br, out_ul)[::-1])
-
-                # Create equivalent rasterio windows in 'other' space.
-                # Note:
-                # - other_in_block boundaries are expanded to ensure that re-projecting between source/reference
-                #   CRSs does not mask valid *_out_block pixels.  This means that consecutive other_in_blocks may
-                #   overlap by more than ``overlap``.
-                # - consecutive other_out_block's may overlap by a pixel.
-                other_in_block = utils.expand_window_to_grid(other_im.window(*proc_im.window_bounds(proc_in_block)))
-                other_out_block = utils.round_window_to_grid(other_im.window(*proc_im.window_bounds(proc_out_block)))
-
-                # create the BlockPair named tuple, assigning 'proc' and 'other' back to 'src' and 'ref' for passing to
-                # read()
-                if self.proc_crs == ProcCrs.ref:
-                    block_pair = BlockPair(
-                        band_i, other_in_block, proc_in_block, other_out_block, proc_out_block, outer
-                    )
-                else:
-                    block_pair = BlockPair(
-                        band_i, proc_in_block, other_in_block, proc_out_block, other_out_block, outer
-                    )
-                yield block_pair
+            for windows in block_windows:
+                yield BlockPair(band_i, *windows)
@@ -18,6 +18,7 @@
 """
 
 import logging
+import math
 import pathlib
 from multiprocessing import cpu_count
 from typing import Tuple, Dict, Union
@@ -51,6 +52,9 @@ table_format = TableFormat(
 
 def nan_equals(a: Union[np.ndarray, float], b: Union[np.ndarray, float]) -> np.ndarray:
     """ Compare two numpy objects a & b, returning true where elements of both a & b are nan. """
+    if np.isscalar(b):
+        # fast path for the common case of comparing an array with a scalar nodata value
+        return np.isnan(a) if np.isnan(b) else (a == b)
     return (a == b) | (np.isnan(a) & np.isnan(b))
 
 
@@ -71,12 +75,14 @@ def expand_window_to_grid(win: Window, expand_pixels: Tuple[int, int] = (0, 0))
     rasterio.windows.Window
         Expanded window.
     """
-    col_off, col_frac = np.divmod(win.col_off - expand_pixels[1], 1)
-    row_off, row_frac = np.divmod(win.row_off - expand_pixels[0], 1)
-    width = np.ceil(win.width + 2 * expand_pixels[1] + col_frac)
-    height = np.ceil(win.height + 2 * expand_pixels[0] + row_frac)
-    exp_win = Window(col_off.astype('int'), row_off.astype('int'), width.astype('int'), height.astype('int'))
-    return exp_win
+    # use python rather than numpy scalar maths, as this is called for every block
+    col_off = math.floor(win.col_off - expand_pixels[1])
+    row_off = math.floor(win.row_off - expand_pixels[0])
+    col_frac = win.col_off - expand_pixels[1] - col_off
+    row_frac = win.row_off - expand_pixels[0] - row_off
+    width = math.ceil(win.width + 2 * expand_pixels[1] + col_frac)
+    height = math.ceil(win.height + 2 * expand_pixels[0] + row_frac)
+    return Window(col_off, row_off, width, height)
 
 
 def round_window_to_grid(win: Window) -> Window:
@@ -93,10 +99,11 @@ def round_window_to_grid(win: Window) -> Window:
     rasterio.windows.Window
         Rounded window with integer extents.
     """
-    row_range, col_range = win.toranges()
-    row_range = np.round(row_range).astype('int')
-    col_range = np.round(col_range).astype('int')
-    return Window(col_off=col_range[0], row_off=row_range[0], width=np.diff(col_range)[0], height=np.diff(row_range)[0])
+    # use python rather than numpy scalar maths, as this is called for every block (python's round() rounds half to
+    # even, as np.round() does)
+    (row_start, row_stop), (col_start, col_stop) = win.toranges()
+    row_start, row_stop, col_start, col_stop = (round(val) for val in (row_start, row_stop, col_start, col_stop))
+    return Window(col_off=col_start, row_off=row_start, width=col_stop - col_start, height=row_stop - row_start)
 
 
 def validate_kernel_shape(kernel_shape: Tuple[int, int], model: Model = Model.gain_blk_offset) -> Tuple[int, int]:
@@ -113,16 +120,17 @@ def validate_kernel_shape(kernel_shape: Tuple[int, int], model: Model = Model.ga
     Returns
     -------
     tuple of int
-        The validated kernel_shape as a numpy array.
+        The validated kernel_shape.
     """
-    kernel_shape = np.array(kernel_shape).astype(int)
-    if not np.all(np.mod(kernel_shape, 2) == 1):
+    # convert to a tuple of python ints, so that callers can use kernel_shape without numpy dispatch
+    kernel_shape = tuple(int(dim) for dim in kernel_shape)
+    if not all(dim % 2 == 1 for dim in kernel_shape):
         raise ValueError('`kernel_shape` must be odd in both dimensions.')
-    if model == Model.gain_offset and np.product(kernel_shape) < 25:
+    if model == Model.gain_offset and (kernel_shape[0] * kernel_shape[1]) < 25:
         raise ValueError('`kernel_shape` area should contain at least 25 elements for the gain-offset model.')
-    if not np.all(kernel_shape >= 1):
+    if not all(dim >= 1 for dim in kernel_shape):
         raise ValueError('`kernel_shape` must be a minimum of one in both dimensions.')
-    return tuple(kernel_shape)
+    return kernel_shape
 
 
 def overlap_for_kernel(kernel_shape: Tuple[int, int]) -> Tuple[int, int]:
@@ -141,8 +149,7 @@ def overlap_for_kernel(kernel_shape: Tuple[int, int]) -> Tuple[int, int]:
     """
     # Block overlap should be at least half the kernel 'shape' to ensure full kernel coverage at block edges, and a
     # minimum of (1, 1) to avoid including extrapolated (rather than interpolated) pixels when up-sampling.
-    kernel_shape = np.array(kernel_shape).astype(int)
-    return tuple(np.ceil(kernel_shape / 2).astype('int'))
+    return tuple(math.ceil(int(dim) / 2) for dim in kernel_shape)
 
 
 def validate_threads(threads: int) -> int:
@@ -211,7 +218,7 @@ def get_nonalpha_bands(im: Union[rio.DatasetReader, rio.io.DatasetWriter]) -> Tu
     list of int
         List of 1-based band indices.
     """
-    bands = tuple([bi + 1 for bi in range(im.count) if im.colorinterp[bi] != ColorInterp.alpha])
+    bands = tuple([bi + 1 for bi, colorinterp in enumerate(im.colorinterp) if colorinterp != ColorInterp.alpha])
     return bands
 
 
@@ -42,6 +42,9 @@ FuseCliParams = namedtuple(
 )  # yapf: disable
 """ Named tuple to wrap fuse cli parameters and string. """
 
+driver_exts = {driver: ext for ext, driver in reversed(rio.drivers.raster_driver_extensions().items())}
+""" Map of driver name to (first) file extension. """
+
 
 def str_contain_no_space(str1: str, str2: str) -> bool:
     """ Test if str2 contain str1, ignoring case and whitespace. """
@@ -65,7 +68,7 @@ def param_file_tile_10x20() -> Path:
 @pytest.fixture
 def byte_array() -> np.ndarray:
     """ 2D byte gradient image with single pixel nodata=255 border. """
-    array = np.array(range(1, 101), dtype='uint8').reshape(20, 5)
+    array = np.arange(1, 101, dtype='uint8').reshape(20, 5)
     array[:, [0, -1]] = 255
     array[[0, -1], :] = 255
     return array
@@ -74,7 +77,7 @@ def byte_array() -> np.ndarray:
 @pytest.fixture
 def float_100cm_array() -> np.ndarray:
     """ 2D float32 gradient image with single pixel nodata=nan border. """
-    array = np.array(range(1, 201), dtype='float32').reshape(20, 10)
+    array = np.arange(1, 201, dtype='float32').reshape(20, 10)
     array[:, [0, -1]] = float('nan')
     array[[0, -1], :] = float('nan')
     return array
@@ -93,7 +96,7 @@ def float_50cm_array(float_100cm_array: np.ndarray) -> np.ndarray:
 def byte_profile(byte_array: np.ndarray) -> Dict:
     """ rasterio profile dict for byte_array. """
     profile = {
-        'crs': CRS({'init': 'epsg:3857'}),
+        'crs': CRS.from_epsg(3857),
         'transform': Affine.identity() * Affine.translation(1e-10, 1e-10),
         'count': 1 if byte_array.ndim < 3 else byte_array.shape[0],
         'dtype': rio.uint8,
@@ -109,7 +112,7 @@ def byte_profile(byte_array: np.ndarray) -> Dict:
 def float_100cm_profile(float_100cm_array: np.ndarray) -> Dict:
     """ rasterio profile dict for float_100cm_array. """
     profile = {
-        'crs': CRS({'init': 'epsg:3857'}),
+        'crs': CRS.from_epsg(3857),
         'transform': Affine.identity(),
         'count': 1 if float_100cm_array.ndim < 3 else float_100cm_array.shape[0],
         'dtype': rio.float32,
@@ -125,7 +128,7 @@ def float_100cm_profile(float_100cm_array: np.ndarray) -> Dict:
 def float_50cm_profile(float_50cm_array: np.ndarray) -> Dict:
     """ rasterio profile dict for float_50cm_array. """
     profile = {
-        'crs': CRS({'init': 'epsg:3857'}),
+        'crs': CRS.from_epsg(3857),
         'transform': Affine.identity() * Affine.scale(0.5),
         'count': 1 if float_50cm_array.ndim < 3 else float_50cm_array.shape[0],
         'dtype': rio.float32,
@@ -219,9 +222,8 @@ def float_45cm_ra(float_45cm_array: np.ndarray, float_45cm_profile: Dict) -> Ras
 def byte_file(tmp_path: Path, byte_array: np.ndarray, byte_profile: Dict) -> Path:
     """ Single band byte geotiff. """
     filename = tmp_path.joinpath('uint8.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **byte_profile) as ds:
-            ds.write(byte_array, indexes=1)
+    with rio.open(filename, 'w', **byte_profile) as ds:
+        ds.write(byte_array, indexes=1)
     return filename
 
 
@@ -235,9 +237,8 @@ def rgba_file(tmp_path: Path, byte_array: np.ndarray, byte_profile: Dict) -> Pat
     profile.update(
         count=4, nodata=None, colorinterp=[ColorInterp.red, ColorInterp.green, ColorInterp.blue, ColorInterp.alpha]
     )
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(array, indexes=range(1, 5))
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(array, indexes=range(1, 5))
     return filename
 
 
@@ -245,10 +246,9 @@ def rgba_file(tmp_path: Path, byte_array: np.ndarray, byte_profile: Dict) -> Pat
 def masked_file(tmp_path: Path, byte_array: np.ndarray, byte_profile: Dict) -> Path:
     """ Single band byte geotiff with internal mask (i.e. w/o nodata). """
     filename = tmp_path.joinpath('masked.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **byte_profile) as ds:
-            ds.write(byte_array, indexes=1)
-            ds.write_mask(byte_array != byte_profile['nodata'])
+    with rio.open(filename, 'w', **byte_profile) as ds:
+        ds.write(byte_array, indexes=1)
+        ds.write_mask(byte_array != byte_profile['nodata'])
     return filename
 
 
@@ -256,9 +256,8 @@ def masked_file(tmp_path: Path, byte_array: np.ndarray, byte_profile: Dict) -> P
 def float_100cm_src_file(tmp_path: Path, float_100cm_array: np.ndarray, float_100cm_profile: Dict) -> Path:
     """ Single band float32 geotiff with 100cm pixel resolution. """
     filename = tmp_path.joinpath('float_100cm_src.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **float_100cm_profile) as ds:
-            ds.write(float_100cm_array, indexes=1)
+    with rio.open(filename, 'w', **float_100cm_profile) as ds:
+        ds.write(float_100cm_array, indexes=1)
     return filename
 
 
@@ -272,9 +271,8 @@ def float_100cm_ref_file(tmp_path: Path, float_100cm_array: np.ndarray, float_10
     profile.update(transform=transform, width=shape[1], height=shape[0])
     filename = tmp_path.joinpath('float_100cm_ref.tif')
     window = Window(1, 1, float_100cm_array.shape[1], float_100cm_array.shape[0])
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(float_100cm_array, indexes=1, window=window)
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(float_100cm_array, indexes=1, window=window)
     return filename
 
 
@@ -282,9 +280,8 @@ def float_100cm_ref_file(tmp_path: Path, float_100cm_array: np.ndarray, float_10
 def float_50cm_src_file(tmp_path: Path, float_50cm_array: np.ndarray, float_50cm_profile: Dict) -> Path:
     """ Single band float32 geotiff with 50cm pixel resolution. """
     filename = tmp_path.joinpath('float_50cm_src.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **float_50cm_profile) as ds:
-            ds.write(float_50cm_array, indexes=1)
+    with rio.open(filename, 'w', **float_50cm_profile) as ds:
+        ds.write(float_50cm_array, indexes=1)
     return filename
 
 
@@ -298,9 +295,8 @@ def float_50cm_ref_file(tmp_path: Path, float_50cm_array: np.ndarray, float_50cm
     profile.update(transform=transform, width=shape[1], height=shape[0])
     filename = tmp_path.joinpath('float_50cm_ref.tif')
     window = Window(1, 1, float_50cm_array.shape[1], float_50cm_array.shape[0])
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(float_50cm_array, indexes=1, window=window)
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(float_50cm_array, indexes=1, window=window)
     return filename
 
 
@@ -308,9 +304,8 @@ def float_50cm_ref_file(tmp_path: Path, float_50cm_array: np.ndarray, float_50cm
 def float_45cm_src_file(tmp_path: Path, float_45cm_array: np.ndarray, float_45cm_profile: Dict) -> Path:
     """ Single band float32 geotiff with 45cm pixel resolution. """
     filename = tmp_path.joinpath('float_45cm_src.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **float_45cm_profile) as ds:
-            ds.write(float_45cm_array, indexes=1)
+    with rio.open(filename, 'w', **float_45cm_profile) as ds:
+        ds.write(float_45cm_array, indexes=1)
     return filename
 
 
@@ -324,9 +319,8 @@ def float_45cm_ref_file(tmp_path: Path, float_45cm_array: np.ndarray, float_45cm
     profile.update(transform=transform, width=shape[1], height=shape[0])
     filename = tmp_path.joinpath('float_45cm_ref.tif')
     window = Window(1, 1, float_45cm_array.shape[1], float_45cm_array.shape[0])
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(float_45cm_array, indexes=1, window=window)
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(float_45cm_array, indexes=1, window=window)
     return filename
 
 
@@ -337,9 +331,8 @@ def float_100cm_rgb_file(tmp_path: Path, float_100cm_array: np.ndarray, float_10
     profile = float_100cm_profile.copy()
     profile.update(count=3)
     filename = tmp_path.joinpath('float_100cm_rgb.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(array, indexes=[1, 2, 3])
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(array, indexes=[1, 2, 3])
     return filename
 
 
@@ -350,13 +343,12 @@ def float_50cm_rgb_file(tmp_path: Path, float_50cm_array: np.ndarray, float_50cm
     profile = float_50cm_profile.copy()
     profile.update(count=3)
     filename = tmp_path.joinpath('float_50cm_rgb.tif')
-    with rio.Env(GDAL_NUM_THREADS='ALL_CPUs'):
-        with rio.open(filename, 'w', **profile) as ds:
-            ds.write(array, indexes=[1, 2, 3])
+    with rio.open(filename, 'w', **profile) as ds:
+        ds.write(array, indexes=[1, 2, 3])
     return filename
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def runner() -> CliRunner:
     """ click runner for command line execution. """
     return CliRunner()
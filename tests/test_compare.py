@@ -37,15 +37,14 @@ def _test_identical_compare_dict(res_list: List):
     assert (len(res_list) == 4)
     bands = [res_item['band'] for res_item in res_list]
     assert (bands[-1] == 'Mean')
-    band_list = res_list[:-1]
-    r2 = np.array([res_item['r2'] for res_item in band_list])
-    rmse = np.array([res_item['rmse'] for res_item in band_list])
-    rrmse = np.array([res_item['rrmse'] for res_item in band_list])
-    n = np.array([res_item['n'] for res_item in band_list])
-    assert (r2 == pytest.approx(1))
-    assert (rmse == pytest.approx(0))
-    assert (rrmse == pytest.approx(0))
-    assert (n == n[0]).all()
+    # extract arrays of the band statistics
+    band_stats = {
+        key: np.array([res_item[key] for res_item in res_list[:-1]]) for key in ['r2', 'rmse', 'rrmse', 'n']
+    }  # yapf: disable
+    assert (band_stats['r2'] == pytest.approx(1))
+    assert (band_stats['rmse'] == pytest.approx(0))
+    assert (band_stats['rrmse'] == pytest.approx(0))
+    assert (band_stats['n'] == band_stats['n'][0]).all()
     assert (res_list[-1]['r2'] == pytest.approx(1))
     assert (res_list[-1]['rmse'] == pytest.approx(0))
     assert (res_list[-1]['rrmse'] == pytest.approx(0))
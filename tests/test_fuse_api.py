@@ -20,16 +20,19 @@ import os
 from pathlib import Path
 from typing import Tuple, Dict
 
+import numpy as np
 import pytest
 import rasterio as rio
 import yaml
 from pytest import FixtureRequest
 from rasterio.features import shapes
+from rasterio.windows import Window
 
 from homonim import utils
 from homonim.enums import ProcCrs, Model
 from homonim.errors import IoError
 from homonim.fuse import RasterFuse
+from tests.conftest import driver_exts
 
 
 @pytest.mark.parametrize(
@@ -110,6 +113,51 @@ def test_basic_fusion(
         assert (out_array[out_mask] == pytest.approx(src_array[src_mask], abs=2))
 
 
+@pytest.mark.parametrize('proc_crs, driver', [
+    (ProcCrs.ref, 'GTiff'),
+    (ProcCrs.src, 'GTiff'),
+    (ProcCrs.ref, 'EHdr'),
+    (ProcCrs.src, 'EHdr'),
+])  # yapf: disable
+def test_nodata_blocks(
+    tmp_path: Path, float_100cm_array: np.ndarray, float_100cm_profile: Dict, float_100cm_ref_file: Path,
+    proc_crs: ProcCrs, driver: str
+):
+    """ Test fusion of a source image with fully masked blocks gives masked corrected and parameter blocks. """
+    # create a source image with the top half masked
+    src_array = float_100cm_array.copy()
+    src_array[:10] = float('nan')
+    src_file = tmp_path.joinpath('src.tif')
+    with rio.open(src_file, 'w', **float_100cm_profile) as src_ds:
+        src_ds.write(src_array, indexes=1)
+
+    block_config = RasterFuse.create_block_config(max_block_mem=2.e-4)
+    out_profile = RasterFuse.create_out_profile(driver=driver, creation_options={})
+    corr_filename = tmp_path.joinpath(f'corrected.{driver_exts[driver]}')
+    param_filename = utils.create_param_filename(corr_filename)
+    raster_fuse = RasterFuse(src_file, float_100cm_ref_file, proc_crs=proc_crs)
+    with raster_fuse:
+        raster_fuse.process(
+            corr_filename, Model.gain, (1, 1), param_filename=param_filename, out_profile=out_profile,
+            block_config=block_config
+        )
+    with rio.open(corr_filename, 'r') as out_ds:
+        out_array = out_ds.read(indexes=1)
+        out_mask = out_ds.dataset_mask().astype('bool', copy=False)
+        src_mask = ~np.isnan(src_array)
+        assert (out_mask == src_mask).all()
+        assert (out_array[out_mask] == pytest.approx(src_array[src_mask], abs=2))
+
+    # test the parameter image is masked over the masked half of the source (the parameter image is on the proc_crs
+    # image grid, which is used to find the masked region, as not all drivers store south-up transforms)
+    proc_file = float_100cm_ref_file if proc_crs == ProcCrs.ref else src_file
+    with rio.open(src_file, 'r') as src_ds, rio.open(proc_file, 'r') as proc_ds:
+        src_to_proc = ~proc_ds.transform * src_ds.transform
+    with rio.open(param_filename, 'r') as param_ds:
+        param_array = param_ds.read(window=Window(src_to_proc.c, src_to_proc.f, src_array.shape[1], 10))
+        assert np.isnan(param_array).all()
+
+
 @pytest.mark.parametrize(
     'out_profile', [
         dict(
@@ -31,7 +31,7 @@ from homonim import utils
 from homonim.cli import cli
 from homonim.enums import ProcCrs, Model
 from homonim.fuse import RasterFuse
-from tests.conftest import str_contain_no_space, FuseCliParams
+from tests.conftest import str_contain_no_space, FuseCliParams, driver_exts
 
 
 @pytest.mark.parametrize(
@@ -346,9 +346,7 @@ def test_r2_inpaint_thresh_error(runner: CliRunner, basic_fuse_cli_params: FuseC
 def test_out_profile(runner: CliRunner, basic_fuse_cli_params: FuseCliParams, driver: str, dtype: str, nodata: float):
     """ Test --out-* options generate a correctly configured output. """
     cli_str = basic_fuse_cli_params.cli_str + f' --driver {driver} --dtype {dtype} --nodata {nodata}'
-    ext_dict = rio.drivers.raster_driver_extensions()
-    ext_idx = list(ext_dict.values()).index(driver)
-    ext = list(ext_dict.keys())[ext_idx]
+    ext = driver_exts[driver]
     corr_file = basic_fuse_cli_params.corr_file.parent.joinpath(f'{basic_fuse_cli_params.corr_file.stem}.{ext}')
     result = runner.invoke(cli, cli_str.split())
     assert (result.exit_code == 0)
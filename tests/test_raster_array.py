@@ -84,6 +84,75 @@ def test_nodata_mask(byte_ra: RasterArray):
     assert byte_ra.mask.all()
 
 
+def test_mask_update(byte_ra: RasterArray):
+    """ Test the mask is updated when the array is changed. """
+    mask = byte_ra.mask.copy()
+
+    # test in-place changes to the array update the mask, including changes through a previously returned array
+    array = byte_ra.array
+    byte_ra.array[1, 1] = byte_ra.nodata
+    assert not byte_ra.mask[1, 1]
+    array[1, 1] = 0
+    assert byte_ra.mask[1, 1]
+
+    # test setting the array updates the mask
+    byte_ra.array = np.full_like(byte_ra.array, byte_ra.nodata)
+    assert not byte_ra.mask.any()
+
+    # test setting nodata updates the mask
+    byte_ra.nodata = None
+    assert byte_ra.mask.all()
+    byte_ra.array[~mask] = 0
+    byte_ra.nodata = 255
+    assert (byte_ra.mask == ~mask).all()
+
+
+def test_nodata_partial_bands(float_50cm_ra: RasterArray):
+    """ Test setting nodata replaces the current nodata value in all bands, including bands of valid pixels. """
+    ra = RasterArray.from_profile(np.stack((float_50cm_ra.array, ) * 2), float_50cm_ra.profile)
+    ra.nodata = float('nan')
+    row, col = np.argwhere(ra.mask)[0]
+    ra.array[1, row, col] = float('nan')
+    assert ra.mask[row, col]  # pixel is valid in band 1
+    ra.nodata = -1
+    assert not np.any(np.isnan(ra.array))
+    assert ra.array[1, row, col] == -1
+
+
+def test_nodata_invalid(byte_ra: RasterArray):
+    """ Test setting, or masking with, a nodata value that an integer array cannot represent raises an error. """
+    array = byte_ra.array.copy()
+    for nodata in [float('nan'), 256, -1, 1.5]:
+        with pytest.raises(ValueError):
+            byte_ra.nodata = nodata
+        assert (byte_ra.array == array).all()
+
+    nan_ra = RasterArray(byte_ra.array, byte_ra.crs, byte_ra.transform, nodata=float('nan'))
+    with pytest.raises(ValueError):
+        nan_ra.mask = byte_ra.mask
+
+
+def test_nodata_float(byte_ra: RasterArray):
+    """ Test setting a float nodata value on an integer array. """
+    mask = byte_ra.mask
+    byte_ra.nodata = float(byte_ra.nodata)
+    byte_ra.nodata = 0.
+    assert byte_ra.nodata == 0
+    assert byte_ra.dtype == 'uint8'
+    assert (byte_ra.mask == mask).all()
+    assert (byte_ra.array[~mask] == 0).all()
+
+
+def test_mask_float_nodata(byte_ra: RasterArray):
+    """ Test masking an integer array with a float nodata value. """
+    float_ra = RasterArray(byte_ra.array, byte_ra.crs, byte_ra.transform, nodata=float(byte_ra.nodata))
+    mask = float_ra.mask
+    mask[np.divide(mask.shape, 2).astype('int')] = False
+    float_ra.mask = mask
+    assert (float_ra.mask == mask).all()
+    assert float_ra.dtype == 'uint8'
+
+
 def test_array_set_shape(byte_ra: RasterArray):
     """ Test setting array with different rows/cols raises error. """
     with pytest.raises(ValueError):
@@ -263,3 +332,37 @@ def test_reprojection(rgb_byte_ra: RasterArray):
     assert (
         reprj_ra.array[:, reprj_ra.mask].mean() == pytest.approx(rgb_byte_ra.array[:, rgb_byte_ra.mask].mean(), abs=.1)
     )
+
+    # reproject with user specified num_threads and warp_mem_limit
+    thread_ra = rgb_byte_ra.reproject(
+        crs=to_crs, transform=to_transform, shape=tuple(np.array(rgb_byte_ra.shape) * 2),
+        resampling=Resampling.bilinear, num_threads=1, warp_mem_limit=16
+    )
+    assert (thread_ra.array == pytest.approx(reprj_ra.array, nan_ok=True))
+
+    # reproject into a provided array
+    out = np.empty((rgb_byte_ra.count, *thread_ra.shape), dtype='float32')
+    out_ra = rgb_byte_ra.reproject(
+        crs=to_crs, transform=to_transform, shape=thread_ra.shape, resampling=Resampling.bilinear, out=out
+    )
+    assert (out_ra.array is out)
+    assert (out_ra.array == pytest.approx(reprj_ra.array, nan_ok=True))
+    with pytest.raises(ValueError):
+        rgb_byte_ra.reproject(crs=to_crs, transform=to_transform, shape=thread_ra.shape, out=out[0])
+
+
+@pytest.mark.parametrize('nodata', [float('nan'), 0, None])
+def test_reprojection_block_mean(float_50cm_ra: RasterArray, nodata: float):
+    """ Test 'average' re-projection to an aligned integer down-sampled grid matches the GDAL warper. """
+    src_ra = RasterArray.from_profile(np.stack((float_50cm_ra.array, ) * 2), float_50cm_ra.profile)
+    src_ra.nodata = nodata
+    dst_nodata = RasterArray.default_nodata if nodata is None else nodata
+    for scale, offset, shape in [(2, (0, 0), (20, 10)), (3, (2, 4), (10, 5)), (1, (1, 1), (30, 10))]:
+        transform = src_ra.transform * Affine.translation(*offset[::-1]) * Affine.scale(scale)
+        block_ra = src_ra.reproject(transform=transform, shape=shape, nodata=dst_nodata, resampling=Resampling.average)
+        assert (block_ra.transform == transform)
+        # force use of the GDAL warper by passing a reproject() kwarg
+        warp_ra = src_ra.reproject(
+            transform=transform, shape=shape, nodata=dst_nodata, resampling=Resampling.average, init_dest_nodata=True
+        )
+        assert (block_ra.array == pytest.approx(warp_ra.array, nan_ok=True))
@@ -18,18 +18,23 @@
 """
 
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Dict
 
 import numpy as np
 import pytest
 import rasterio as rio
 from pytest import FixtureRequest
 from rasterio import MemoryFile
+from rasterio.crs import CRS
 from rasterio.enums import Resampling
+from rasterio.env import get_gdal_config
+from rasterio.vrt import WarpedVRT
 from rasterio.windows import Window, union
 
+from homonim import root_path
 from homonim.enums import ProcCrs
 from homonim.errors import ImageContentError, BlockSizeError, IoError
+from homonim.raster_array import RasterArray
 from homonim.raster_pair import RasterPairReader
 
 
@@ -105,6 +110,47 @@ def test_not_open_exception(float_50cm_src_file: Path, float_100cm_ref_file: Pat
         _ = raster_pair.read(None)
 
 
+def test_close(tmp_path: Path):
+    """ Test that closing a raster pair in different CRSs closes the datasets, including any WarpedVRT source. """
+    # create a reference file in a different CRS to the source
+    src_file = root_path.joinpath('tests/data/source/3324c_2015_1004_05_0182_RGB.tif')
+    ref_file = tmp_path.joinpath('ref_32735.tif')
+    with rio.open(root_path.joinpath('tests/data/reference/MODIS-006-MCD43A4-2015_09_15_B143.tif'), 'r') as ref_im:
+        with WarpedVRT(ref_im, crs=CRS.from_epsg(32735), resampling=Resampling.bilinear) as ref_vrt:
+            RasterArray.from_rio_dataset(ref_vrt).to_file(ref_file)
+
+    with RasterPairReader(src_file, ref_file) as raster_pair:
+        ims = (raster_pair.src_im, raster_pair.ref_im)
+        assert any([isinstance(im, WarpedVRT) for im in ims])
+    assert raster_pair.closed
+    for im in ims:
+        assert im.closed
+        if isinstance(im, WarpedVRT):
+            assert im.src_dataset.closed
+
+
+def test_gdal_cache_size(tmp_path: Path, float_100cm_array: np.ndarray, float_100cm_profile: Dict):
+    """ Test the GDAL block cache size is raised to hold a row of native blocks, but not lowered. """
+    # create source and reference images with 16x16 tiles
+    profile = float_100cm_profile.copy()
+    profile.update(tiled=True, blockxsize=16, blockysize=16)
+    filenames = [tmp_path.joinpath('src.tif'), tmp_path.joinpath('ref.tif')]
+    for filename in filenames:
+        with rio.open(filename, 'w', **profile) as ds:
+            ds.write(float_100cm_array, indexes=1)
+
+    # expected cache size is one row of 16 pixel high tiles of float32 data in each image
+    exp_cache_size = 2 * profile['count'] * np.dtype(profile['dtype']).itemsize * 16 * profile['width']
+    raster_pair = RasterPairReader(*filenames)
+    with rio.Env(GDAL_CACHEMAX=1):
+        with raster_pair:
+            assert get_gdal_config('GDAL_CACHEMAX') == exp_cache_size
+        assert get_gdal_config('GDAL_CACHEMAX') == 1
+    with rio.Env(GDAL_CACHEMAX=exp_cache_size * 2):
+        with raster_pair:
+            assert get_gdal_config('GDAL_CACHEMAX') == exp_cache_size * 2
+
+
 @pytest.mark.parametrize(
     'src_file, ref_file, proc_crs, blk_overlap, max_block_mem', [
         ('float_45cm_src_file', 'float_100cm_ref_file', ProcCrs.auto, (0, 0), 1.e-3),